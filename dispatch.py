@@ -0,0 +1,104 @@
+import os
+
+VIEWS_PER_TASK = 20
+CHEAP_DURATION = 30
+FUNCTION_TIMEOUT = int(os.getenv("FUNCTION_TIMEOUT", 530))
+DEADLINE_FACTOR = 3
+MIN_DEADLINE = 60
+BATCH_DURATION = FUNCTION_TIMEOUT // DEADLINE_FACTOR
+
+
+def get_batches(accounts_headers, costs, consolidated=False):
+    """Group views into task batches by historical cost
+
+    Views without history or slower than CHEAP_DURATION get their own batch,
+    cheap views of an account are packed up to BATCH_DURATION & VIEWS_PER_TASK
+    to drain the queue faster. Consolidated loads pack every view of an account
+    by VIEWS_PER_TASK, costliest first, so that loads stay batched.
+
+    Args:
+        accounts_headers (list): List of accounts with headers
+        costs (dict): Cost by view_id
+        consolidated (bool, optional): Pack views regardless of cost.
+            Defaults to False.
+
+    Returns:
+        list: List of batches
+    """
+
+    batches = []
+    for account in accounts_headers:
+        views = [
+            {
+                "view": {
+                    "view_id": view["view_id"],
+                    "website": view["website"],
+                    "principal_content_type": view["principal_content_type"],
+                },
+                "duration": costs.get(view["view_id"], {}).get(
+                    "duration", float("inf")
+                ),
+            }
+            for view in account["value"]
+        ]
+        if consolidated:
+            views = sorted(views, key=lambda x: x["duration"], reverse=True)
+            groups = [
+                views[i : i + VIEWS_PER_TASK]
+                for i in range(0, len(views), VIEWS_PER_TASK)
+            ]
+        else:
+            costly_views = [
+                view for view in views if view["duration"] >= CHEAP_DURATION
+            ]
+            cheap_views = sorted(
+                [view for view in views if view["duration"] < CHEAP_DURATION],
+                key=lambda x: x["duration"],
+                reverse=True,
+            )
+            groups = [[view] for view in costly_views]
+            for view in cheap_views:
+                if (
+                    groups
+                    and groups[-1][0]["duration"] < CHEAP_DURATION
+                    and len(groups[-1]) < VIEWS_PER_TASK
+                    and sum([i["duration"] for i in groups[-1]]) + view["duration"]
+                    <= BATCH_DURATION
+                ):
+                    groups[-1].append(view)
+                else:
+                    groups.append([view])
+        batches.extend(
+            [
+                {
+                    "headers": account["headers"],
+                    "views": [view["view"] for view in group],
+                    "duration": sum([view["duration"] for view in group]),
+                    "costly": max([view["duration"] for view in group])
+                    >= CHEAP_DURATION,
+                }
+                for group in groups
+            ]
+        )
+    return batches
+
+
+def get_dispatch_deadline(batch):
+    """Get dispatch deadline of a batch, at most the function timeout
+
+    Cloud Tasks would retry a task past its deadline while it still runs, &
+    the function is killed at its timeout anyway. Batches with a costly or
+    unknown view get the whole timeout, only cheap batches are scaled down.
+
+    Args:
+        batch (dict): Batch
+
+    Returns:
+        int: Dispatch deadline in seconds
+    """
+
+    if batch["costly"]:
+        return FUNCTION_TIMEOUT
+    return int(
+        min(max(batch["duration"] * DEADLINE_FACTOR, MIN_DEADLINE), FUNCTION_TIMEOUT)
+    )
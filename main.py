@@ -1,6 +1,59 @@
-from models import UAJob
+from models import UAJob, BufferedLoader
+from sinks import BigQuerySink, get_sink
 from tasks import create_tasks
 
+# Consolidated tables, rollups & costs are only implemented in BigQuery
+BIGQUERY_FLAGS = ["consolidated", "rollup", "record_cost"]
+
+
+def get_job(data, view, loader=None):
+    """Build the job of a view from the request
+
+    Args:
+        data (dict): Request data
+        view (dict): View with view_id, website & principal_content_type
+        loader (BufferedLoader, optional): Consolidated loader. Defaults to None.
+
+    Returns:
+        UAJob: Job
+    """
+
+    return UAJob(
+        headers=data["headers"],
+        view_id=view["view_id"],
+        website=view["website"],
+        principal_content_type=view["principal_content_type"],
+        start=data.get("start"),
+        end=data.get("end"),
+        prefetch=data.get("prefetch", False),
+        loader=loader,
+        skip_unchanged=data.get("skip_unchanged", False),
+        profile=data.get("profile", False),
+        rollup=data.get("rollup", False),
+        record_cost=data.get("record_cost", False),
+    )
+
+
+def run_views(data, loader=None):
+    """Run the job of every view, a failed view does not fail the others
+
+    Args:
+        data (dict): Request data
+        loader (BufferedLoader, optional): Consolidated loader. Defaults to None.
+
+    Returns:
+        list: Job Response or error of every view
+    """
+
+    responses = []
+    for view in data["views"]:
+        try:
+            responses.append(get_job(data, view, loader).run())
+        except Exception as e:
+            print(view["view_id"], repr(e))
+            responses.append({"view_id": view["view_id"], "error": repr(e)})
+    return responses
+
 
 def main(request):
     """API Gateway
@@ -9,7 +62,7 @@ def main(request):
         request (flask.Request): HTTP request
 
     Raises:
-        NotImplementedError: No module found
+        NotImplementedError: No module found, or BigQuery flags on another sink
 
     Returns:
         dict: HTTP Response
@@ -18,17 +71,41 @@ def main(request):
     data = request.get_json()
     print(data)
 
+    if [flag for flag in BIGQUERY_FLAGS if data.get(flag)] and not isinstance(
+        get_sink(), BigQuerySink
+    ):
+        raise NotImplementedError(data)
+
     if "tasks" in data:
         response = create_tasks(data)
     elif "view_id" in data and "broadcast" not in data:
-        response = UAJob(
-            headers=data["headers"],
-            view_id=data["view_id"],
-            website=data["website"],
-            principal_content_type=data["principal_content_type"],
-            start=data.get("start"),
-            end=data.get("end"),
-        ).run()
+        loader = (
+            BufferedLoader(
+                rollup=data.get("rollup", False),
+                profile=data.get("profile", False),
+            )
+            if data.get("consolidated")
+            else None
+        )
+        response = get_job(data, data, loader).run()
+        if loader:
+            response["loads"] = loader.flush()
+            if loader.profiler:
+                response["loads_profile"] = loader.profiler.stages
+    elif "views" in data:
+        loader = (
+            BufferedLoader(
+                rollup=data.get("rollup", False),
+                profile=data.get("profile", False),
+            )
+            if data.get("consolidated")
+            else None
+        )
+        response = {"views": run_views(data, loader)}
+        if loader:
+            response["loads"] = loader.flush()
+            if loader.profiler:
+                response["loads_profile"] = loader.profiler.stages
     else:
         raise NotImplementedError(data)
 
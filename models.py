@@ -1,18 +1,315 @@
 import time
+import json
+import hashlib
+import uuid
 from datetime import datetime, timedelta
+from timeit import default_timer
 from abc import abstractmethod, ABCMeta
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 
+from google.api_core.exceptions import GoogleAPICallError
 from google.cloud import bigquery
 
+from sinks import DATASET, BigQuerySink, get_sink
+from profiling import StageProfiler
+
 NOW = datetime.utcnow()
 DATE_FORMAT = "%Y-%m-%d"
 
 PAGE_SIZE = 50000
+PREFETCH_WORKERS = 5
+BUFFER_BYTES = 256 * 1024 * 1024
+STAGING_EXPIRATION = timedelta(days=1)
+DML_RETRIES = 5
+DML_BACKOFF = 10
+DML_RETRY_ERRORS = [
+    "Could not serialize access",
+    "concurrent update",
+    "Too many DML statements outstanding",
+]
+
+URL = "https://analyticsreporting.googleapis.com/v4/reports:batchGet"
+
+ROLLUP_PERIODS = ["WEEK", "MONTH"]
+# Unique users can not be summed across days, so rollups count user-days. A
+# user-day is only counted once per row at the daily grain, so user metrics are
+# dropped from rollups whose dimensions are reduced from the daily report.
+USER_METRICS = ["users", "newUsers", "sessionsPerUser"]
+ROLLUP_METRICS = {
+    "users": "SUM(users) AS userDays",
+    "newUsers": "SUM(newUsers) AS newUserDays",
+    "sessionsPerUser": "SAFE_DIVIDE(SUM(sessions), SUM(users)) AS sessionsPerUserDay",
+    "pageviewsPerSession": """
+        SAFE_DIVIDE(SUM(pageviews), SUM(sessions)) AS pageviewsPerSession
+    """,
+    "avgSessionDuration": """
+        SAFE_DIVIDE(SUM(avgSessionDuration * sessions), SUM(sessions))
+        AS avgSessionDuration
+    """,
+    "bounceRate": """
+        SAFE_DIVIDE(SUM(bounceRate * sessions), SUM(sessions)) AS bounceRate
+    """,
+    "avgTimeOnPage": """
+        SAFE_DIVIDE(SUM(avgTimeOnPage * pageviews), SUM(pageviews)) AS avgTimeOnPage
+    """,
+}
+COST_TABLE = "_ViewCosts"
+COST_SCHEMA = [
+    {"name": "view_id", "type": "STRING"},
+    {"name": "duration", "type": "FLOAT"},
+    {"name": "_batched_at", "type": "TIMESTAMP"},
+]
+COST_RUNS = 5
+HASH_TABLE = "_PartitionHashes"
+HASH_SCHEMA = [
+    {"name": "table", "type": "STRING"},
+    {"name": "view_id", "type": "STRING"},
+    {"name": "date", "type": "DATE"},
+    {"name": "hash", "type": "STRING"},
+    {"name": "_batched_at", "type": "TIMESTAMP"},
+]
+
+
+def get_bq_client():
+    """Get the BigQuery client of the configured sink
+
+    Raises:
+        NotImplementedError: Sink is not BigQuery
+
+    Returns:
+        google.cloud.bigquery.Client: BigQuery client
+    """
+
+    sink = get_sink()
+    if not isinstance(sink, BigQuerySink):
+        raise NotImplementedError(sink)
+    return sink.client
+
+
+def run_dml(client, query):
+    """Run a mutating DML query, retrying with backoff on concurrent DML errors
+
+    Args:
+        client (google.cloud.bigquery.Client): BigQuery client
+        query (str): Query
+
+    Raises:
+        GoogleAPICallError: Non-retryable error or out of retries
+
+    Returns:
+        google.cloud.bigquery.table.RowIterator: Query result
+    """
+
+    for attempt in range(DML_RETRIES):
+        try:
+            return client.query(query).result()
+        except GoogleAPICallError as e:
+            if attempt == DML_RETRIES - 1 or not [
+                i for i in DML_RETRY_ERRORS if i in str(e)
+            ]:
+                raise
+            time.sleep(DML_BACKOFF * 2**attempt)
+
+
+def get_hashes(view_id, start, end):
+    """Get the latest stored partition hashes of a view
+
+    Args:
+        view_id (str): View ID
+        start (str): Date
+        end (str): Date
+
+    Returns:
+        dict: Hash by (table, date)
+    """
+
+    return {
+        (row["table"], str(row["date"])): row["hash"]
+        for row in get_sink().latest(
+            HASH_TABLE,
+            ["table", "view_id", "date"],
+            {"view_id": view_id, "date": (start, end)},
+        )
+    }
+
+
+def put_hashes(hashes):
+    """Store partition hashes of loaded partitions
+
+    Args:
+        hashes (list): List of hash rows
+    """
+
+    if hashes:
+        get_sink().append(
+            HASH_TABLE,
+            hashes,
+            HASH_SCHEMA,
+            partition_field="date",
+            clustering_fields=["view_id"],
+        )
+
+
+def get_costs():
+    """Get the average cost of the latest runs of every view
+
+    The cost table is created here, by the dispatcher, so runs only stream into
+    an existing table.
+
+    Returns:
+        dict: Cost by view_id
+    """
+
+    client = get_bq_client()
+    client.create_table(
+        bigquery.Table(
+            f"{client.project}.{DATASET}.{COST_TABLE}",
+            schema=COST_SCHEMA,
+        ),
+        exists_ok=True,
+    )
+    query = f"""
+    SELECT
+        view_id,
+        AVG(duration) AS duration
+    FROM
+        (
+            SELECT
+                *,
+                ROW_NUMBER() over (
+                    PARTITION BY view_id
+                    ORDER BY _batched_at DESC
+                ) AS row_num
+            FROM
+                {DATASET}.{COST_TABLE}
+        )
+    WHERE
+        row_num <= {COST_RUNS}
+    GROUP BY
+        view_id
+    """
+    return {
+        row["view_id"]: {
+            "duration": row["duration"],
+        }
+        for row in client.query(query).result()
+    }
+
+
+def put_costs(costs):
+    """Stream the costs of runs, logging failures since the data is loaded already
+
+    Args:
+        costs (list): List of cost rows
+    """
+
+    if costs:
+        try:
+            errors = get_bq_client().insert_rows_json(
+                f"{DATASET}.{COST_TABLE}",
+                costs,
+            )
+            if errors:
+                print(errors)
+        except Exception as e:
+            print(e)
+
+
+def get_rollup_query(report_cls, source, view_ids, start, end):
+    """Build the query replacing the weekly & monthly rollups touched by a date range
+
+    Args:
+        report_cls (type): Report class
+        source (str): Source table or subquery with a view_id column
+        view_ids (list): View IDs
+        start (str): Date
+        end (str): Date
+
+    Returns:
+        str: Query
+    """
+
+    table = f"{report_cls.report}__Rollup"
+    keys = ["view_id", "_website", "_principal_content_type"]
+    dimensions = [*keys, *report_cls.rollup_dimensions]
+    reduced = set(report_cls.dimensions) - {"date"} - set(report_cls.rollup_dimensions)
+    metrics = [
+        ROLLUP_METRICS.get(metric, f"SUM({metric}) AS {metric}")
+        for metric in report_cls.metrics
+        if not reduced or metric not in USER_METRICS
+    ]
+    view_ids = ",".join([f"'{view_id}'" for view_id in view_ids])
+    periods = [
+        f"""
+        SELECT
+            '{period}' AS period,
+            DATE_TRUNC(CAST(date AS DATE), {period}) AS period_start,
+            *
+        FROM
+            {source}
+        WHERE
+            view_id IN ({view_ids})
+            AND CAST(date AS DATE) BETWEEN DATE_TRUNC(DATE '{start}', {period})
+            AND LAST_DAY(DATE '{end}', {period})
+        """
+        for period in ROLLUP_PERIODS
+    ]
+    touched = [
+        f"""(
+            t.period = '{period}'
+            AND t.period_start BETWEEN DATE_TRUNC(DATE '{start}', {period})
+            AND DATE_TRUNC(DATE '{end}', {period})
+        )"""
+        for period in ROLLUP_PERIODS
+    ]
+    return f"""
+    CREATE TEMP TABLE _rollup_rows AS
+    SELECT
+        period,
+        period_start,
+        {','.join(dimensions)},
+        {','.join(metrics)}
+    FROM
+        ({' UNION ALL '.join(periods)})
+    GROUP BY
+        period,
+        period_start,
+        {','.join(dimensions)};
+
+    CREATE TABLE IF NOT EXISTS {DATASET}.{table}
+    PARTITION BY period_start
+    CLUSTER BY _website, view_id AS
+    SELECT * FROM _rollup_rows LIMIT 0;
+
+    MERGE {DATASET}.{table} t
+    USING _rollup_rows s
+    ON FALSE
+    WHEN NOT MATCHED BY TARGET THEN
+        INSERT ROW
+    WHEN NOT MATCHED BY SOURCE
+        AND t.view_id IN ({view_ids})
+        AND ({' OR '.join(touched)}) THEN
+        DELETE;
+    """
+
 
-BQ_CLIENT = bigquery.Client()
-DATASET = "GoogleAnalytics"
+def update_rollups(report_cls, source, view_ids, start, end):
+    """Recompute weekly & monthly rollups of the periods touched by a date range
+
+    Args:
+        report_cls (type): Report class
+        source (str): Source table or subquery with a view_id column
+        view_ids (list): View IDs
+        start (str): Date
+        end (str): Date
+    """
+
+    run_dml(
+        get_bq_client(),
+        get_rollup_query(report_cls, source, view_ids, start, end),
+    )
 
 
 class IReport(metaclass=ABCMeta):
@@ -31,8 +328,11 @@ class IReport(metaclass=ABCMeta):
 
         self.column_header = {}
         self.rows = []
+        self.row_count = None
         self.get_done = False
         self.next_page_token = None
+        self.hashes = []
+        self.num_skipped = 0
 
     @property
     @abstractmethod
@@ -49,13 +349,21 @@ class IReport(metaclass=ABCMeta):
     def metrics(self):
         pass
 
+    @property
+    @abstractmethod
+    def rollup_dimensions(self):
+        pass
+
     @property
     def table(self):
         return f"{self.report}__{self.view_id}"
 
-    def get_request(self):
+    def get_request(self, page_token=None):
         """Build request payload
 
+        Args:
+            page_token (str, optional): Page token. Defaults to next page token.
+
         Returns:
             dict: Request payload
         """
@@ -80,8 +388,9 @@ class IReport(metaclass=ABCMeta):
             ],
             "pageSize": PAGE_SIZE,
         }
-        if self.next_page_token:
-            request["pageToken"] = self.next_page_token
+        page_token = page_token or self.next_page_token
+        if page_token:
+            request["pageToken"] = page_token
         return request
 
     def transform(self):
@@ -115,59 +424,82 @@ class IReport(metaclass=ABCMeta):
                 )
             self.rows = rows
 
-    def load(self):
-        """Load to staging table
+    def hash_partitions(self):
+        """Hash transformed rows per date, ignoring _batched_at
 
         Returns:
-            job (google.cloud.bigquery.job.LoadJob): Load job
+            dict: Hash by date
         """
 
-        job = BQ_CLIENT.load_table_from_json(
-            self.rows,
-            f"{DATASET}.{self.table}",
-            job_config=bigquery.LoadJobConfig(
-                schema=self.schema,
-                create_disposition="CREATE_IF_NEEDED",
-                write_disposition="WRITE_APPEND",
-            ),
-        )
-        job.add_done_callback(self._load_callback)
-        return job
+        partitions = {}
+        for row in self.rows:
+            partitions.setdefault(row["date"], []).append(
+                json.dumps(
+                    {k: v for k, v in row.items() if k != "_batched_at"},
+                    sort_keys=True,
+                )
+            )
+        return {
+            date: hashlib.sha256("\n".join(sorted(rows)).encode()).hexdigest()
+            for date, rows in partitions.items()
+        }
 
-    def _load_callback(self, job):
-        """Callback func for load func
+    def skip_unchanged(self, hashes, table):
+        """Drop rows of dates whose hash matches the stored hash
 
         Args:
-            job (google.cloud.bigquery.job.LoadJob): Load job
+            hashes (dict): Stored hash by (table, date)
+            table (str): Destination table
         """
 
-        self._update()
-        self.output_rows = job.result().output_rows
+        partition_hashes = self.hash_partitions()
+        changed = [
+            date
+            for date, _hash in partition_hashes.items()
+            if hashes.get((table, date)) != _hash
+        ]
+        self.rows = [row for row in self.rows if row["date"] in changed]
+        self.hashes = [
+            {
+                "table": table,
+                "view_id": self.view_id,
+                "date": date,
+                "hash": partition_hashes[date],
+                "_batched_at": NOW.isoformat(timespec="seconds"),
+            }
+            for date in changed
+        ]
+        self.num_skipped = len(partition_hashes) - len(changed)
 
-    def _update(self):
-        """Update data in the table to get the latest version"""
+    def load(self, sink):
+        """Load to table & get the latest version
 
-        query = f"""
-        CREATE OR REPLACE TABLE {DATASET}.{self.table} AS
-        SELECT
-            *
-        EXCEPT
-            (row_num)
-        FROM
-            (
-                SELECT
-                    *,
-                    ROW_NUMBER() over (
-                        PARTITION BY {','.join(self.dimensions)}
-                        ORDER BY _batched_at DESC
-                    ) AS row_num
-                FROM
-                    {DATASET}.{self.table}
-            )
-        WHERE
-            row_num = 1
+        Args:
+            sink (ISink): Sink
+        """
+
+        self.output_rows = sink.append(self.table, self.rows, self.schema)
+        self._update(sink)
+
+    def rollup(self):
+        """Update weekly & monthly rollups of the table"""
+
+        update_rollups(
+            type(self),
+            f"(SELECT '{self.view_id}' AS view_id, * FROM {DATASET}.{self.table})",
+            [self.view_id],
+            self.start,
+            self.end,
+        )
+
+    def _update(self, sink):
+        """Update data in the table to get the latest version
+
+        Args:
+            sink (ISink): Sink
         """
-        BQ_CLIENT.query(query)
+
+        sink.dedupe(self.table, self.dimensions)
 
 
 class Demographics(IReport):
@@ -180,6 +512,13 @@ class Demographics(IReport):
         "country",
         "socialNetwork",
     ]
+    rollup_dimensions = [
+        "channelGrouping",
+        "deviceCategory",
+        "userType",
+        "country",
+        "socialNetwork",
+    ]
     metrics = [
         "users",
         "newUsers",
@@ -220,6 +559,12 @@ class Ages(IReport):
         "userAgeBracket",
         "socialNetwork",
     ]
+    rollup_dimensions = [
+        "channelGrouping",
+        "deviceCategory",
+        "userAgeBracket",
+        "socialNetwork",
+    ]
     metrics = [
         "users",
         "newUsers",
@@ -260,6 +605,11 @@ class Acquisitions(IReport):
         "fullReferrer",
         "pagePath",
     ]
+    rollup_dimensions = [
+        "channelGrouping",
+        "deviceCategory",
+        "socialNetwork",
+    ]
     metrics = [
         "users",
         "newUsers",
@@ -303,6 +653,11 @@ class Events(IReport):
         "eventAction",
         "socialNetwork",
     ]
+    rollup_dimensions = [
+        "deviceCategory",
+        "eventCategory",
+        "eventAction",
+    ]
     metrics = [
         "users",
         "newUsers",
@@ -346,6 +701,11 @@ class EventsAge(IReport):
         "userAgeBracket",
         "socialNetwork",
     ]
+    rollup_dimensions = [
+        "eventCategory",
+        "eventAction",
+        "userAgeBracket",
+    ]
     metrics = [
         "users",
         "newUsers",
@@ -381,8 +741,225 @@ class EventsAge(IReport):
 
 
 
+class BufferedLoader:
+    def __init__(self, buffer_bytes=BUFFER_BYTES, rollup=False, profile=False):
+        """Buffered loader into consolidated report tables
+
+        Rows from many views are buffered per report & loaded together into a
+        single date-partitioned `{report}` table with a `view_id` column.
+
+        Args:
+            buffer_bytes (int, optional): Serialized size of all buffered rows
+                before flushing. Defaults to BUFFER_BYTES.
+            rollup (bool, optional): Update rollups after loading.
+                Defaults to False.
+            profile (bool, optional): Profile CPU & memory of the final flush.
+                Defaults to False.
+        """
+
+        self.buffer_bytes = buffer_bytes
+        self.rollup = rollup
+        self.profiler = StageProfiler("consolidated") if profile else None
+        self.buffer = {}
+        self.num_bytes = 0
+        self.loads = []
+        self.costs = []
+
+    def add(self, report):
+        """Buffer transformed rows of a report, flushing once over buffer_bytes
+
+        Args:
+            report (IReport): Report
+        """
+
+        buffer = self.buffer.setdefault(
+            report.report,
+            {
+                "report_cls": type(report),
+                "rows": [],
+                "hashes": [],
+            },
+        )
+        buffer["hashes"].extend(report.hashes)
+        rows = [{**row, "view_id": report.view_id} for row in report.rows]
+        buffer["rows"].extend(rows)
+        self.num_bytes += sum([len(json.dumps(row)) for row in rows])
+        if self.num_bytes >= self.buffer_bytes:
+            self.loads.extend(self._flush())
+
+    def add_cost(self, cost, num_processed):
+        """Hold the cost of a run until the final flush
+
+        Args:
+            cost (dict): Cost row
+            num_processed (int): Number of rows of the run
+        """
+
+        self.costs.append((cost, num_processed))
+
+    def flush(self):
+        """Load every buffered report & store held costs
+
+        Each held cost gets a share of the flush duration by number of rows.
+
+        Returns:
+            list: Load responses
+        """
+
+        started_at = default_timer()
+        if self.profiler:
+            self.loads.extend(self.profiler.profile("_flush", self._flush))
+        else:
+            self.loads.extend(self._flush())
+        duration = default_timer() - started_at
+        num_processed = sum([i for _, i in self.costs])
+        shares = [
+            i / num_processed if num_processed else 1 / len(self.costs)
+            for _, i in self.costs
+        ]
+        put_costs(
+            [
+                {**cost, "duration": cost["duration"] + duration * share}
+                for (cost, _), share in zip(self.costs, shares)
+            ]
+        )
+        loads, self.loads, self.costs = self.loads, [], []
+        return loads
+
+    def _flush(self):
+        """Load & empty the buffer
+
+        Returns:
+            list: Load responses
+        """
+
+        buffers, self.buffer, self.num_bytes = self.buffer, {}, 0
+        return [self._load(buffer) for buffer in buffers.values()]
+
+    def _schema(self, report_cls):
+        """Consolidated table schema
+
+        Args:
+            report_cls (type): Report class
+
+        Returns:
+            list: Schema
+        """
+
+        return [{"name": "view_id", "type": "STRING"}] + [
+            {**field, "type": "DATE"} if field["name"] == "date" else field
+            for field in report_cls.schema
+        ]
+
+    def _load(self, buffer):
+        """Load buffered rows to staging table & merge into consolidated table
+
+        Args:
+            buffer (dict): Buffered rows of a report
+
+        Returns:
+            dict: Load response
+        """
+
+        report_cls, rows = buffer["report_cls"], buffer["rows"]
+        client = get_bq_client()
+        table = report_cls.report
+        staging_table = f"{table}__staging__{uuid.uuid4().hex}"
+        schema = self._schema(report_cls)
+
+        _table = bigquery.Table(f"{client.project}.{DATASET}.{table}", schema=schema)
+        _table.time_partitioning = bigquery.TimePartitioning(field="date")
+        _table.clustering_fields = ["view_id"]
+        client.create_table(_table, exists_ok=True)
+
+        _staging_table = bigquery.Table(
+            f"{client.project}.{DATASET}.{staging_table}",
+            schema=schema,
+        )
+        _staging_table.expires = datetime.utcnow() + STAGING_EXPIRATION
+        client.create_table(_staging_table)
+
+        keys = ["view_id", *report_cls.dimensions]
+        columns = [field["name"] for field in schema if field["name"] not in keys]
+        dates = [row["date"] for row in rows]
+        query = f"""
+        MERGE {DATASET}.{table} t
+        USING (
+            SELECT
+                *
+            EXCEPT
+                (row_num)
+            FROM
+                (
+                    SELECT
+                        *,
+                        ROW_NUMBER() over (
+                            PARTITION BY {','.join(keys)}
+                            ORDER BY _batched_at DESC
+                        ) AS row_num
+                    FROM
+                        {DATASET}.{staging_table}
+                )
+            WHERE
+                row_num = 1
+        ) s
+        ON
+            t.date BETWEEN DATE '{min(dates)}' AND DATE '{max(dates)}'
+            AND {' AND '.join([f't.{key} = s.{key}' for key in keys])}
+        WHEN MATCHED THEN
+            UPDATE SET {','.join([f'{column} = s.{column}' for column in columns])}
+        WHEN NOT MATCHED THEN
+            INSERT ROW
+        """
+        try:
+            output_rows = (
+                client.load_table_from_json(
+                    rows,
+                    f"{DATASET}.{staging_table}",
+                    job_config=bigquery.LoadJobConfig(
+                        schema=schema,
+                        write_disposition="WRITE_APPEND",
+                    ),
+                )
+                .result()
+                .output_rows
+            )
+            run_dml(client, query)
+        finally:
+            client.delete_table(f"{DATASET}.{staging_table}", not_found_ok=True)
+        put_hashes(buffer["hashes"])
+        view_ids = list(set([row["view_id"] for row in rows]))
+        if self.rollup:
+            update_rollups(
+                report_cls,
+                f"{DATASET}.{table}",
+                view_ids,
+                min(dates),
+                max(dates),
+            )
+        return {
+            "report": table,
+            "num_views": len(view_ids),
+            "output_rows": output_rows,
+        }
+
+
 class UAJob:
-    def __init__(self, headers, view_id, website, principal_content_type, start, end):
+    def __init__(
+        self,
+        headers,
+        view_id,
+        website,
+        principal_content_type,
+        start,
+        end,
+        prefetch=False,
+        loader=None,
+        skip_unchanged=False,
+        profile=False,
+        rollup=False,
+        record_cost=False,
+    ):
         """Universal Analytics Report Job
 
         Args:
@@ -392,6 +969,17 @@ class UAJob:
             principal_content_type (str): Principal Content Type
             start (str): Date
             end (str): Date
+            prefetch (bool, optional): Get pages concurrently. Defaults to False.
+            loader (BufferedLoader, optional): Load into consolidated tables.
+                Defaults to None.
+            skip_unchanged (bool, optional): Skip dates whose data is unchanged.
+                Defaults to False.
+            profile (bool, optional): Profile CPU & memory per stage.
+                Defaults to False.
+            rollup (bool, optional): Update rollups after loading.
+                Defaults to False.
+            record_cost (bool, optional): Record the run duration for dispatch.
+                Defaults to False.
         """
 
         self.headers = headers
@@ -399,6 +987,12 @@ class UAJob:
         self.website = website
         self.principal_content_type = principal_content_type
         self.start, self.end = self._get_time_range(start, end)
+        self.prefetch = prefetch
+        self.loader = loader
+        self.skip_unchanged = skip_unchanged
+        self.profiler = StageProfiler(view_id) if profile else None
+        self.rollup = rollup
+        self.record_cost = record_cost
         self.reports = [
             Demographics(self),
             Ages(self),
@@ -425,6 +1019,103 @@ class UAJob:
             start = (NOW - timedelta(days=3)).strftime(DATE_FORMAT)
         return start, end
 
+    def _batch_get(self, session, reports, page_tokens=None):
+        """Request a batch of reports
+
+        Args:
+            session (requests.Session): HTTP Session
+            reports (list): List of reports
+            page_tokens (list, optional): Page token per report. Defaults to None.
+
+        Returns:
+            list: List of report responses
+        """
+
+        page_tokens = page_tokens or [None] * len(reports)
+        request_body = {
+            "reportRequests": [
+                report.get_request(page_token)
+                for report, page_token in zip(reports, page_tokens)
+            ],
+        }
+        with session.post(URL, json=request_body, headers=self.headers) as r:
+            r.raise_for_status()
+            res = r.json()
+        return res["reports"]
+
+    def _get_page(self, session):
+        """Get the next page of every report by following its cursor
+
+        Args:
+            session (requests.Session): HTTP Session
+        """
+
+        _reports = self._batch_get(session, self.reports)
+        for report, report_res in zip(self.reports, _reports):
+            report.column_header = report_res["columnHeader"]
+            if report.row_count is None:
+                report.row_count = report_res["data"].get("rowCount")
+            if report_res["data"].get("rows", []):
+                if not report.get_done:
+                    report.rows.extend(report_res["data"]["rows"])
+                next_page_token = report_res.get("nextPageToken")
+                if next_page_token:
+                    report.next_page_token = next_page_token
+                else:
+                    report.get_done = True
+            else:
+                report.get_done = True
+
+    def _prefetch(self):
+        """Get the remaining pages concurrently using rowCount from the first page.
+
+        Page tokens are row offsets, so every remaining page can be requested
+        up front. Reports whose token does not look like an offset are left to
+        the sequential cursor walk, which also resumes after the first page
+        whose size does not match rowCount & after the last page if it still
+        has a nextPageToken.
+        """
+
+        offsets = {
+            report: range(int(report.next_page_token), report.row_count, PAGE_SIZE)
+            for report in self.reports
+            if not report.get_done
+            and report.row_count
+            and report.next_page_token.isdigit()
+            and int(report.next_page_token) == len(report.rows)
+            and int(report.next_page_token) < report.row_count
+        }
+        if not offsets:
+            return
+        num_pages = max([len(i) for i in offsets.values()])
+
+        def _get_page_at(page):
+            reports = [report for report in offsets if page < len(offsets[report])]
+            page_tokens = [str(offsets[report][page]) for report in reports]
+            with requests.Session() as session:
+                return reports, self._batch_get(session, reports, page_tokens)
+
+        pages = {report: [] for report in offsets}
+        for reports, _reports in self._map(
+            _get_page_at, range(num_pages), PREFETCH_WORKERS
+        ):
+            for report, report_res in zip(reports, _reports):
+                pages[report].append(report_res)
+        for report, _pages in pages.items():
+            for offset, report_res in zip(offsets[report], _pages):
+                rows = report_res["data"].get("rows", [])
+                report.rows.extend(rows)
+                if len(rows) != min(PAGE_SIZE, report.row_count - offset):
+                    report.next_page_token = str(offset + len(rows))
+                    report.get_done = not rows
+                    break
+            else:
+                next_page_token = _pages[-1].get("nextPageToken")
+                if next_page_token:
+                    report.next_page_token = next_page_token
+                else:
+                    report.get_done = True
+
     def _get(self):
         """Get data through facade
 
@@ -432,30 +1123,12 @@ class UAJob:
             list: List of rows
         """
 
-        url = "https://analyticsreporting.googleapis.com/v4/reports:batchGet"
         with requests.Session() as session:
-            while True:
-                request_body = {
-                    "reportRequests": [report.get_request() for report in self.reports],
-                }
-                with session.post(url, json=request_body, headers=self.headers) as r:
-                    r.raise_for_status()
-                    res = r.json()
-                _reports = res["reports"]
-                for report, report_res in zip(self.reports, _reports):
-                    report.column_header = report_res["columnHeader"]
-                    if report_res["data"].get("rows", []):
-                        if not report.get_done:
-                            report.rows.extend(report_res["data"]["rows"])
-                        next_page_token = report_res.get("nextPageToken")
-                        if next_page_token:
-                            report.next_page_token = next_page_token
-                        else:
-                            report.get_done = True
-                    else:
-                        report.get_done = True
-                if not [report for report in self.reports if report.get_done is False]:
-                    break
+            self._get_page(session)
+            if self.prefetch:
+                self._prefetch()
+            while [report for report in self.reports if report.get_done is False]:
+                self._get_page(session)
         return sum([len(report.rows) for report in self.reports])
 
     def _transform(self):
@@ -463,12 +1136,86 @@ class UAJob:
 
         [report.transform() for report in self.reports]
 
+    def _skip_unchanged(self):
+        """Skip unchanged dates through facade"""
+
+        hashes = get_hashes(self.view_id, self.start, self.end)
+        [
+            report.skip_unchanged(
+                hashes,
+                report.report if self.loader else report.table,
+            )
+            for report in self.reports
+        ]
+
     def _load(self):
         """Load data through facade"""
 
-        load_jobs = [report.load() for report in self.reports if report.rows]
-        while [job for job in load_jobs if job.state not in ("DONE", "SUCCESS")]:
-            time.sleep(5)
+        if self.loader:
+            [self.loader.add(report) for report in self.reports if report.rows]
+            return
+        def _load_report(report):
+            try:
+                report.load(get_sink())
+            except Exception as e:
+                return e
+
+        reports = [report for report in self.reports if report.rows]
+        errors = self._map(_load_report, reports, len(self.reports))
+        put_hashes(
+            [
+                _hash
+                for report, error in zip(reports, errors)
+                if error is None
+                for _hash in report.hashes
+            ]
+        )
+        for error in errors:
+            if error:
+                raise error
+
+    def _rollup(self):
+        """Update rollups through facade"""
+
+        self._map(
+            lambda report: report.rollup(),
+            [report for report in self.reports if report.rows],
+            len(self.reports),
+        )
+
+    def _map(self, func, items, max_workers):
+        """Map over items in a thread pool, serially while profiling
+
+        cProfile only sees the calling thread, so profiled stages run serially.
+
+        Args:
+            func (callable): Function
+            items (iterable): Items
+            max_workers (int): Number of threads
+
+        Returns:
+            list: Results in order
+        """
+
+        if self.profiler:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(func, items))
+
+    def _run_stage(self, stage, func):
+        """Run a stage, under the profiler if enabled
+
+        Args:
+            stage (str): Stage
+            func (callable): Stage function
+
+        Returns:
+            Any: Stage result
+        """
+
+        if self.profiler:
+            return self.profiler.profile(stage, func)
+        return func()
 
     def run(self):
         """Run function
@@ -477,7 +1224,8 @@ class UAJob:
             dict: Job Response
         """
 
-        num_processed = self._get()
+        started_at = default_timer()
+        num_processed = self._run_stage("_get", self._get)
         response = {
             "view_id": self.view_id,
             "start": self.start,
@@ -491,13 +1239,30 @@ class UAJob:
             ],
         }
         if num_processed > 0:
-            self._transform()
-            self._load()
+            self._run_stage("_transform", self._transform)
+            if self.skip_unchanged:
+                self._run_stage("_skip_unchanged", self._skip_unchanged)
+            self._run_stage("_load", self._load)
+            if self.rollup and not self.loader:
+                self._run_stage("_rollup", self._rollup)
             response["reports"] = [
                 {
                     **report_res,
+                    "num_skipped": report.num_skipped,
                     "output_rows": getattr(report, "output_rows", None),
                 }
                 for report, report_res in zip(self.reports, response["reports"])
             ]
+        if self.profiler:
+            response["profile"] = self.profiler.stages
+        if self.record_cost:
+            cost = {
+                "view_id": self.view_id,
+                "duration": default_timer() - started_at,
+                "_batched_at": NOW.isoformat(timespec="seconds"),
+            }
+            if self.loader:
+                self.loader.add_cost(cost, num_processed)
+            else:
+                put_costs([cost])
         return response
@@ -0,0 +1,111 @@
+import os
+import uuid
+import cProfile
+import pstats
+import tracemalloc
+from datetime import datetime
+
+PROFILE_TOP = 10
+PROFILE_DIR = os.getenv("PROFILE_DIR")
+
+
+class StageProfiler:
+    def __init__(self, name, top=PROFILE_TOP, profile_dir=PROFILE_DIR):
+        """CPU & memory profiler of job stages
+
+        Args:
+            name (str): Job name, used for dump files
+            top (int, optional): Number of top entries. Defaults to PROFILE_TOP.
+            profile_dir (str, optional): Directory to dump pstats files.
+                Defaults to PROFILE_DIR.
+        """
+
+        self.name = name
+        self.run_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.top = top
+        self.profile_dir = profile_dir
+        self.stages = []
+
+    def profile(self, stage, func):
+        """Run a stage under cProfile & tracemalloc
+
+        Args:
+            stage (str): Stage
+            func (callable): Stage function
+
+        Returns:
+            Any: Stage result
+        """
+
+        profiler = cProfile.Profile()
+        tracemalloc.start()
+        profiler.enable()
+        try:
+            return func()
+        finally:
+            profiler.disable()
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.stages.append(
+                {
+                    "stage": stage,
+                    "peak_memory": peak,
+                    "top_functions": self._top_functions(profiler),
+                    "top_allocations": [
+                        {
+                            "line": str(stat.traceback),
+                            "size": stat.size,
+                            "count": stat.count,
+                        }
+                        for stat in snapshot.statistics("lineno")[: self.top]
+                    ],
+                    "dump": self._dump(stage, profiler),
+                }
+            )
+
+    def _top_functions(self, profiler):
+        """Top functions by cumulative time
+
+        Args:
+            profiler (cProfile.Profile): Profiler
+
+        Returns:
+            list: Top functions
+        """
+
+        stats = sorted(
+            pstats.Stats(profiler).stats.items(),
+            key=lambda x: x[1][3],
+            reverse=True,
+        )
+        return [
+            {
+                "function": f"{file}:{line}({func})",
+                "calls": calls,
+                "total_time": round(total_time, 4),
+                "cumulative_time": round(cumulative_time, 4),
+            }
+            for (file, line, func), (_, calls, total_time, cumulative_time, _) in stats[
+                : self.top
+            ]
+        ]
+
+    def _dump(self, stage, profiler):
+        """Dump pstats file if a profile directory is set
+
+        Args:
+            stage (str): Stage
+            profiler (cProfile.Profile): Profiler
+
+        Returns:
+            str: Dump path
+        """
+
+        if self.profile_dir:
+            path = os.path.join(
+                self.profile_dir,
+                f"{self.name}-{self.run_id}{stage}.prof",
+            )
+            profiler.dump_stats(path)
+            return path
@@ -0,0 +1,393 @@
+import os
+import sqlite3
+from abc import abstractmethod, ABCMeta
+from contextlib import closing
+
+from google.api_core.exceptions import NotFound
+from google.cloud import bigquery
+
+DATASET = "GoogleAnalytics"
+SINK_PATH = "GoogleAnalytics.db"
+
+SINK = None
+
+
+class ISink(metaclass=ABCMeta):
+    """Sink Interface"""
+
+    @abstractmethod
+    def append(self, table, rows, schema, partition_field=None, clustering_fields=None):
+        """Append rows to a table, creating it if needed
+
+        Args:
+            table (str): Table
+            rows (list): List of rows
+            schema (list): Schema
+            partition_field (str, optional): Date partition column of a new table.
+                Defaults to None.
+            clustering_fields (list, optional): Clustering columns of a new table.
+                Defaults to None.
+
+        Returns:
+            int: Output rows
+        """
+
+        pass
+
+    @abstractmethod
+    def dedupe(self, table, keys):
+        """Keep only the latest version by _batched_at of every key
+
+        Args:
+            table (str): Table
+            keys (list): Key columns
+        """
+
+        pass
+
+    @abstractmethod
+    def latest(self, table, keys, where):
+        """Get the latest version by _batched_at of every key among matching rows
+
+        Args:
+            table (str): Table
+            keys (list): Key columns
+            where (dict): Value per column, or (start, end) for a range
+
+        Returns:
+            list: List of rows, empty if the table does not exist
+        """
+
+        pass
+
+    @abstractmethod
+    def count(self, table):
+        """Count rows of a table
+
+        Args:
+            table (str): Table
+
+        Returns:
+            int: Number of rows
+        """
+
+        pass
+
+
+class BigQuerySink(ISink):
+    def __init__(self, dataset=DATASET):
+        """BigQuery Sink
+
+        Args:
+            dataset (str, optional): Dataset. Defaults to DATASET.
+        """
+
+        self.client = bigquery.Client()
+        self.dataset = dataset
+
+    def append(self, table, rows, schema, partition_field=None, clustering_fields=None):
+        """Append rows with a blocking load job
+
+        Args:
+            table (str): Table
+            rows (list): List of rows
+            schema (list): Schema
+            partition_field (str, optional): Date partition column of a new table.
+                Defaults to None.
+            clustering_fields (list, optional): Clustering columns of a new table.
+                Defaults to None.
+
+        Returns:
+            int: Output rows
+        """
+
+        job_config = bigquery.LoadJobConfig(
+            schema=schema,
+            create_disposition="CREATE_IF_NEEDED",
+            write_disposition="WRITE_APPEND",
+        )
+        if partition_field:
+            job_config.time_partitioning = bigquery.TimePartitioning(
+                field=partition_field
+            )
+        if clustering_fields:
+            job_config.clustering_fields = clustering_fields
+        return (
+            self.client.load_table_from_json(
+                rows,
+                f"{self.dataset}.{table}",
+                job_config=job_config,
+            )
+            .result()
+            .output_rows
+        )
+
+    def dedupe(self, table, keys):
+        """Rewrite the table with the latest version of every key
+
+        Args:
+            table (str): Table
+            keys (list): Key columns
+        """
+
+        query = f"""
+        CREATE OR REPLACE TABLE {self.dataset}.{table} AS
+        SELECT
+            *
+        EXCEPT
+            (row_num)
+        FROM
+            (
+                SELECT
+                    *,
+                    ROW_NUMBER() over (
+                        PARTITION BY {','.join(keys)}
+                        ORDER BY _batched_at DESC
+                    ) AS row_num
+                FROM
+                    {self.dataset}.{table}
+            )
+        WHERE
+            row_num = 1
+        """
+        self.client.query(query).result()
+
+    def latest(self, table, keys, where):
+        """Get the latest version of every key among matching rows
+
+        Args:
+            table (str): Table
+            keys (list): Key columns
+            where (dict): Value per column, or (start, end) for a range
+
+        Returns:
+            list: List of rows, empty if the table does not exist
+        """
+
+        conditions = [
+            f"{column} BETWEEN '{value[0]}' AND '{value[1]}'"
+            if isinstance(value, tuple)
+            else f"{column} = '{value}'"
+            for column, value in where.items()
+        ]
+        query = f"""
+        SELECT
+            *
+        EXCEPT
+            (row_num)
+        FROM
+            (
+                SELECT
+                    *,
+                    ROW_NUMBER() over (
+                        PARTITION BY {','.join(keys)}
+                        ORDER BY _batched_at DESC
+                    ) AS row_num
+                FROM
+                    {self.dataset}.{table}
+                WHERE
+                    {' AND '.join(conditions)}
+            )
+        WHERE
+            row_num = 1
+        """
+        try:
+            return [dict(row.items()) for row in self.client.query(query).result()]
+        except NotFound:
+            return []
+
+    def count(self, table):
+        """Count rows from table metadata
+
+        Args:
+            table (str): Table
+
+        Returns:
+            int: Number of rows
+        """
+
+        return self.client.get_table(f"{self.dataset}.{table}").num_rows
+
+
+class SQLiteSink(ISink):
+    types = {
+        "STRING": "TEXT",
+        "DATE": "TEXT",
+        "TIMESTAMP": "TEXT",
+        "INTEGER": "INTEGER",
+        "FLOAT": "REAL",
+    }
+
+    def __init__(self, path=SINK_PATH):
+        """Local SQLite Sink
+
+        Args:
+            path (str, optional): Database file. Defaults to SINK_PATH.
+        """
+
+        self.path = path
+
+    def _connect(self):
+        """Open a connection, closed on exit
+
+        Returns:
+            contextlib.closing: Connection
+        """
+
+        return closing(sqlite3.connect(self.path, timeout=60))
+
+    def append(self, table, rows, schema, partition_field=None, clustering_fields=None):
+        """Append rows in a single transaction
+
+        Args:
+            table (str): Table
+            rows (list): List of rows
+            schema (list): Schema
+            partition_field (str, optional): Ignored by SQLite. Defaults to None.
+            clustering_fields (list, optional): Ignored by SQLite. Defaults to None.
+
+        Returns:
+            int: Output rows
+        """
+
+        columns = [f'"{field["name"]}"' for field in schema]
+        column_types = [
+            f'"{field["name"]}" {self.types[field["type"]]}' for field in schema
+        ]
+        with self._connect() as conn, conn:
+            conn.execute(
+                f'CREATE TABLE IF NOT EXISTS "{table}" ({",".join(column_types)})'
+            )
+            conn.executemany(
+                f"""
+                INSERT INTO "{table}" ({','.join(columns)})
+                VALUES ({','.join(['?'] * len(columns))})
+                """,
+                [[row.get(field["name"]) for field in schema] for row in rows],
+            )
+        return len(rows)
+
+    def dedupe(self, table, keys):
+        """Delete every row but the latest version of every key
+
+        Args:
+            table (str): Table
+            keys (list): Key columns
+        """
+
+        keys = [f'"{key}"' for key in keys]
+        with self._connect() as conn, conn:
+            conn.execute(
+                f"""
+                DELETE FROM "{table}"
+                WHERE rowid NOT IN (
+                    SELECT
+                        rowid
+                    FROM
+                        (
+                            SELECT
+                                rowid,
+                                ROW_NUMBER() over (
+                                    PARTITION BY {','.join(keys)}
+                                    ORDER BY _batched_at DESC
+                                ) AS row_num
+                            FROM
+                                "{table}"
+                        )
+                    WHERE
+                        row_num = 1
+                )
+                """
+            )
+
+    def latest(self, table, keys, where):
+        """Get the latest version of every key among matching rows
+
+        Args:
+            table (str): Table
+            keys (list): Key columns
+            where (dict): Value per column, or (start, end) for a range
+
+        Returns:
+            list: List of rows, empty if the table does not exist
+        """
+
+        conditions = [
+            f'"{column}" BETWEEN ? AND ?'
+            if isinstance(value, tuple)
+            else f'"{column}" = ?'
+            for column, value in where.items()
+        ]
+        params = [
+            i
+            for value in where.values()
+            for i in (value if isinstance(value, tuple) else (value,))
+        ]
+        keys = [f'"{key}"' for key in keys]
+        with self._connect() as conn:
+            if not conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                [table],
+            ).fetchone():
+                return []
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                f"""
+                SELECT
+                    *
+                FROM
+                    (
+                        SELECT
+                            *,
+                            ROW_NUMBER() over (
+                                PARTITION BY {','.join(keys)}
+                                ORDER BY _batched_at DESC
+                            ) AS row_num
+                        FROM
+                            "{table}"
+                        WHERE
+                            {' AND '.join(conditions)}
+                    )
+                WHERE
+                    row_num = 1
+                """,
+                params,
+            ).fetchall()
+        return [
+            {k: row[k] for k in row.keys() if k != "row_num"} for row in rows
+        ]
+
+    def count(self, table):
+        """Count rows
+
+        Args:
+            table (str): Table
+
+        Returns:
+            int: Number of rows
+        """
+
+        with self._connect() as conn:
+            return conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+
+
+def get_sink():
+    """Get the sink configured by the SINK env var, created on first use
+
+    Raises:
+        NotImplementedError: No sink found
+
+    Returns:
+        ISink: Sink
+    """
+
+    global SINK
+    if SINK is None:
+        sink = os.getenv("SINK", "bigquery")
+        if sink == "bigquery":
+            SINK = BigQuerySink()
+        elif sink == "sqlite":
+            SINK = SQLiteSink(os.getenv("SINK_PATH", SINK_PATH))
+        else:
+            raise NotImplementedError(sink)
+    return SINK
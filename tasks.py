@@ -6,6 +6,9 @@ import uuid
 import requests
 from google.cloud import tasks_v2, secretmanager
 
+from dispatch import get_batches, get_dispatch_deadline
+from models import get_costs
+
 
 BASE_ID = "apporLbA6XsKHTKpz"
 VIEW = "Sorted by GA"
@@ -161,20 +164,38 @@ def create_tasks(tasks_data):
         }
         for account in accounts
     ]
+    # Cost history is only kept up to date by jobs recording their cost
+    costs = get_costs() if tasks_data.get("record_cost") else {}
+    batches = sorted(
+        get_batches(
+            accounts_headers,
+            costs,
+            tasks_data.get("consolidated", False),
+        ),
+        key=lambda x: x["duration"],
+        reverse=True,
+    )
     payloads = [
         {
-            "name": f"{view['view_id']}-{uuid.uuid4()}",
+            "name": f"{batch['views'][0]['view_id']}-{uuid.uuid4()}",
+            "dispatch_deadline": get_dispatch_deadline(batch),
             "payload": {
-                "headers": account["headers"],
-                "view_id": view["view_id"],
-                "website": view["website"],
-                "principal_content_type": view["principal_content_type"],
+                "headers": batch["headers"],
+                **(
+                    batch["views"][0]
+                    if len(batch["views"]) == 1
+                    else {"views": batch["views"]}
+                ),
                 "start": tasks_data.get("start"),
                 "end": tasks_data.get("end"),
+                "prefetch": tasks_data.get("prefetch", False),
+                "consolidated": tasks_data.get("consolidated", False),
+                "skip_unchanged": tasks_data.get("skip_unchanged", False),
+                "rollup": tasks_data.get("rollup", False),
+                "record_cost": tasks_data.get("record_cost", False),
             },
         }
-        for account in accounts_headers
-        for view in account["value"]
+        for batch in batches
     ]
     tasks = [
         {
@@ -190,6 +211,9 @@ def create_tasks(tasks_data):
                 },
                 "body": json.dumps(payload["payload"]).encode(),
             },
+            "dispatch_deadline": {
+                "seconds": payload["dispatch_deadline"],
+            },
         }
         for payload in payloads
     ]
@@ -0,0 +1,80 @@
+import pytest
+
+from dispatch import (
+    get_batches,
+    get_dispatch_deadline,
+    BATCH_DURATION,
+    CHEAP_DURATION,
+    FUNCTION_TIMEOUT,
+    MIN_DEADLINE,
+    VIEWS_PER_TASK,
+)
+
+HEADERS = {"Authorization": "Bearer token"}
+
+
+def get_accounts(num_views):
+    return [
+        {
+            "key": "cdbabe@",
+            "headers": HEADERS,
+            "value": [
+                {
+                    "view_id": str(i),
+                    "website": f"{i}.com",
+                    "principal_content_type": "Travel",
+                }
+                for i in range(num_views)
+            ],
+        }
+    ]
+
+
+def test_costly_views_alone():
+    costs = {"0": {"duration": CHEAP_DURATION}, "1": {"duration": 1}}
+    batches = get_batches(get_accounts(3), costs)
+    assert [[view["view_id"] for view in i["views"]] for i in batches] == [
+        ["0"],
+        ["2"],
+        ["1"],
+    ]
+    assert batches[1]["duration"] == float("inf")
+    assert batches[0]["headers"] == HEADERS
+    assert [get_dispatch_deadline(i) for i in batches[:2]] == [FUNCTION_TIMEOUT] * 2
+
+
+def test_cheap_views_packed():
+    costs = {str(i): {"duration": 1} for i in range(VIEWS_PER_TASK + 1)}
+    batches = get_batches(get_accounts(VIEWS_PER_TASK + 1), costs)
+    assert [len(i["views"]) for i in batches] == [VIEWS_PER_TASK, 1]
+
+
+def test_cheap_views_within_batch_duration():
+    duration = CHEAP_DURATION - 1
+    costs = {str(i): {"duration": duration} for i in range(VIEWS_PER_TASK)}
+    batches = get_batches(get_accounts(VIEWS_PER_TASK), costs)
+    assert all([i["duration"] <= BATCH_DURATION for i in batches])
+    assert sum([len(i["views"]) for i in batches]) == VIEWS_PER_TASK
+
+
+def test_consolidated_views_packed():
+    costs = {"0": {"duration": CHEAP_DURATION}, "1": {"duration": 1}}
+    batches = get_batches(get_accounts(VIEWS_PER_TASK + 1), costs, consolidated=True)
+    assert [len(i["views"]) for i in batches] == [VIEWS_PER_TASK, 1]
+    assert batches[-1]["views"][0]["view_id"] == "1"
+    assert batches[0]["costly"] and not batches[-1]["costly"]
+
+
+@pytest.mark.parametrize(
+    ("batch", "deadline"),
+    [
+        ({"duration": 1, "costly": False}, MIN_DEADLINE),
+        ({"duration": 100, "costly": False}, 300),
+        ({"duration": BATCH_DURATION * 2, "costly": False}, FUNCTION_TIMEOUT),
+        ({"duration": CHEAP_DURATION, "costly": True}, FUNCTION_TIMEOUT),
+        ({"duration": float("inf"), "costly": True}, FUNCTION_TIMEOUT),
+    ],
+    ids=["min", "scaled", "capped", "costly", "unknown"],
+)
+def test_dispatch_deadline(batch, deadline):
+    assert get_dispatch_deadline(batch) == deadline
@@ -0,0 +1,202 @@
+import re
+
+import pytest
+
+import models
+from models import UAJob
+
+VIEW_ID = "101307510"
+START = "2021-09-01"
+END = "2021-09-02"
+
+ROWS = [
+    {"date": START, "users": "1", "_batched_at": "2021-09-01T00:00:00"},
+    {"date": END, "users": "1", "_batched_at": "2021-09-01T00:00:00"},
+]
+
+# https://cloud.google.com/bigquery/docs/reference/standard-sql/lexical#reserved_keywords
+BQ_RESERVED = """
+ALL AND ANY ARRAY AS ASC ASSERT_ROWS_MODIFIED AT BETWEEN BY CASE CAST COLLATE
+CONTAINS CREATE CROSS CUBE CURRENT DEFAULT DEFINE DESC DISTINCT ELSE END ENUM
+ESCAPE EXCEPT EXCLUDE EXISTS EXTRACT FALSE FETCH FOLLOWING FOR FROM FULL GROUP
+GROUPING GROUPS HASH HAVING IF IGNORE IN INNER INTERSECT INTERVAL INTO IS JOIN
+LATERAL LEFT LIKE LIMIT LOOKUP MERGE NATURAL NEW NO NOT NULL NULLS OF ON OR ORDER
+OUTER OVER PARTITION PRECEDING PROTO QUALIFY RANGE RECURSIVE RESPECT RIGHT ROLLUP
+ROWS SELECT SET SOME STRUCT TABLESAMPLE THEN TO TREAT TRUE UNBOUNDED UNION UNNEST
+USING WHEN WHERE WINDOW WITH WITHIN
+""".split()
+
+
+def get_job(**kwargs):
+    return UAJob(
+        headers={},
+        view_id=VIEW_ID,
+        website="whimsysoul.com",
+        principal_content_type="Travel",
+        start=START,
+        end=END,
+        **kwargs,
+    )
+
+
+def test_skip_unchanged():
+    report = get_job().reports[0]
+    report.rows = list(ROWS)
+    hashes = {
+        (report.table, date): _hash for date, _hash in report.hash_partitions().items()
+    }
+    hashes[(report.table, END)] = "changed"
+    report.skip_unchanged(hashes, report.table)
+    assert report.rows == [ROWS[1]]
+    assert [i["date"] for i in report.hashes] == [END]
+    assert report.num_skipped == 1
+
+
+def test_skip_unchanged_other_table():
+    report = get_job().reports[0]
+    report.rows = list(ROWS)
+    hashes = {
+        (report.table, date): _hash for date, _hash in report.hash_partitions().items()
+    }
+    report.skip_unchanged(hashes, report.report)
+    assert report.rows == ROWS
+    assert report.num_skipped == 0
+
+
+class FakeReporting:
+    def __init__(self, num_rows, row_count=None, short_offsets=(), cursor=False):
+        """Fake Reporting API paging over rows "0", "1", ...
+
+        Args:
+            num_rows (int): Number of rows served
+            row_count (int, optional): rowCount reported. Defaults to num_rows.
+            short_offsets (tuple, optional): Offsets serving one row less.
+            cursor (bool, optional): Serve non-offset page tokens.
+        """
+
+        self.rows = [str(i) for i in range(num_rows)]
+        self.row_count = row_count or num_rows
+        self.short_offsets = short_offsets
+        self.cursor = cursor
+
+    def batch_get(self, session, reports, page_tokens=None):
+        page_tokens = page_tokens or [report.next_page_token for report in reports]
+        return [self._get(page_token) for page_token in page_tokens]
+
+    def _get(self, page_token):
+        offset = int((page_token or "0").lstrip("c"))
+        size = models.PAGE_SIZE - (offset in self.short_offsets)
+        rows = self.rows[offset : offset + size]
+        res = {
+            "columnHeader": {},
+            "data": {"rowCount": self.row_count, "rows": rows},
+        }
+        if offset + len(rows) < len(self.rows):
+            res["nextPageToken"] = (
+                f"c{offset + len(rows)}" if self.cursor else str(offset + len(rows))
+            )
+        return res
+
+
+@pytest.mark.parametrize(
+    "reporting",
+    [
+        FakeReporting(10),
+        FakeReporting(10, short_offsets=(3,)),
+        FakeReporting(15, row_count=10),
+        FakeReporting(12, row_count=9),
+        FakeReporting(10, cursor=True),
+        FakeReporting(6, row_count=3),
+    ],
+    ids=[
+        "full",
+        "short_page",
+        "long_last_page",
+        "next_page_token",
+        "cursor",
+        "past_row_count",
+    ],
+)
+def test_prefetch(monkeypatch, reporting):
+    monkeypatch.setattr(models, "PAGE_SIZE", 3)
+    job = get_job(prefetch=True)
+    monkeypatch.setattr(job, "_batch_get", reporting.batch_get)
+    job._get()
+    for report in job.reports:
+        assert report.rows == reporting.rows
+
+
+def test_buffered_loader_flush_by_bytes(monkeypatch):
+    loader = models.BufferedLoader(buffer_bytes=1)
+    loads = []
+    monkeypatch.setattr(loader, "_load", lambda buffer: loads.append(buffer) or {})
+    report = get_job(loader=loader).reports[0]
+    report.rows = list(ROWS)
+    loader.add(report)
+    assert [row["view_id"] for row in loads[0]["rows"]] == [VIEW_ID, VIEW_ID]
+    assert loader.buffer == {} and loader.num_bytes == 0
+    assert loader.flush() == [{}]
+
+
+def test_rollup_query():
+    query = models.get_rollup_query(
+        models.Demographics, "source", [VIEW_ID], START, END
+    )
+    assert f"DATE_TRUNC(DATE '{START}', WEEK)" in query
+    assert f"LAST_DAY(DATE '{END}', MONTH)" in query
+    assert "SUM(users) AS userDays" in query
+    assert "SAFE_DIVIDE(SUM(bounceRate * sessions), SUM(sessions))" in query
+    assert "DELETE" in query and "INSERT ROW" in query
+
+
+def test_rollup_query_reduced_grain():
+    query = models.get_rollup_query(
+        models.Acquisitions, "source", [VIEW_ID], START, END
+    )
+    assert "userDays" not in query and "newUserDays" not in query
+    assert "SUM(sessions) AS sessions" in query
+
+
+@pytest.mark.parametrize(
+    "report_cls",
+    [
+        models.Demographics,
+        models.Ages,
+        models.Acquisitions,
+        models.Events,
+        models.EventsAge,
+    ],
+)
+def test_rollup_query_identifiers(report_cls):
+    query = models.get_rollup_query(report_cls, "source", [VIEW_ID], START, END)
+    identifiers = {
+        word for word in re.findall(r"\b[A-Za-z_]\w*\b", query) if word != word.upper()
+    }
+    assert not {word for word in identifiers if word.upper() in BQ_RESERVED}
+
+
+def test_profile_prefetch(monkeypatch, tmp_path):
+    monkeypatch.setattr(models, "PAGE_SIZE", 3)
+    reporting = FakeReporting(10)
+    job = get_job(prefetch=True, profile=True)
+    job.profiler.profile_dir = tmp_path
+    monkeypatch.setattr(job, "_batch_get", reporting.batch_get)
+    job._run_stage("_get", job._get)
+    stage = job.profiler.stages[0]
+    assert [i for i in stage["top_functions"] if "(_get_page_at)" in i["function"]]
+    assert stage["peak_memory"] > 0
+    assert job.profiler.run_id in stage["dump"]
+    assert get_job(profile=True).profiler.run_id != job.profiler.run_id
+
+
+def test_buffered_loader_costs(monkeypatch):
+    costs = []
+    monkeypatch.setattr(models, "put_costs", costs.extend)
+    loader = models.BufferedLoader()
+    monkeypatch.setattr(loader, "_load", lambda buffer: {})
+    loader.add_cost({"view_id": "1", "duration": 1}, 3)
+    loader.add_cost({"view_id": "2", "duration": 1}, 1)
+    monkeypatch.setattr(models, "default_timer", iter([0, 4]).__next__)
+    loader.flush()
+    assert [i["duration"] for i in costs] == [4, 2]
+    assert loader.costs == []
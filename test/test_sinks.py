@@ -0,0 +1,38 @@
+import pytest
+
+from sinks import SQLiteSink
+
+START = "2021-09-01"
+END = "2021-09-24"
+
+SCHEMA = [
+    {"name": "date", "type": "DATE"},
+    {"name": "users", "type": "INTEGER"},
+    {"name": "_batched_at", "type": "TIMESTAMP"},
+]
+ROWS = [
+    {"date": START, "users": "1", "_batched_at": "2021-09-01T00:00:00"},
+    {"date": END, "users": "1", "_batched_at": "2021-09-01T00:00:00"},
+    {"date": START, "users": "2", "_batched_at": "2021-09-02T00:00:00"},
+]
+
+
+@pytest.fixture
+def sink(tmp_path):
+    sink = SQLiteSink(tmp_path / "test.db")
+    sink.append("test", ROWS, SCHEMA)
+    return sink
+
+
+def test_dedupe(sink):
+    sink.dedupe("test", ["date"])
+    assert sink.count("test") == 2
+
+
+def test_latest(sink):
+    rows = sink.latest("test", ["date"], {"date": (START, START)})
+    assert rows == [{"date": START, "users": 2, "_batched_at": ROWS[2]["_batched_at"]}]
+
+
+def test_latest_missing_table(sink):
+    assert sink.latest("missing", ["date"], {"date": START}) == []
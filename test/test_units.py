@@ -3,6 +3,8 @@ from unittest.mock import Mock
 import pytest
 
 from main import main
+from models import get_bq_client, ROLLUP_PERIODS
+from sinks import DATASET
 from tasks import get_token
 
 VIEW_ID = "101307510"
@@ -39,16 +41,75 @@ def run(data):
     [
         ID,
         {**ID, **DATE},
+        {**ID, **DATE, "prefetch": True},
+        {**ID, **DATE, "consolidated": True},
+        {**ID, **DATE, "skip_unchanged": True},
+        {**ID, **DATE, "profile": True},
+    ],
+    ids=[
+        "auto",
+        "manual",
+        "prefetch",
+        "consolidated",
+        "skip_unchanged",
+        "profile",
     ],
-    ids=["auto", "manual"],
 )
 def test_units(data):
     res = run(data)
     results = res["results"]
     for i in results["reports"]:
         assert i["num_processed"] >= 0
-        if i["num_processed"] > 0:
+        if i["num_processed"] > 0 and "loads" not in results and not i["num_skipped"]:
             assert i["output_rows"] == i["num_processed"]
+    for i in results.get("loads", []):
+        assert i["output_rows"] > 0
+    for i in results.get("profile", []):
+        assert i["peak_memory"] > 0
+
+
+def test_rollup():
+    res = run({**ID, **DATE, "rollup": True})
+    for i in res["reports"]:
+        if i["num_processed"] > 0:
+            rows = get_bq_client().query(
+                f"""
+                SELECT DISTINCT
+                    period
+                FROM
+                    {DATASET}.{i["report"]}__Rollup
+                WHERE
+                    view_id = '{VIEW_ID}'
+                    AND period_start BETWEEN DATE_TRUNC(DATE '{START}', MONTH)
+                    AND DATE '{END}'
+                """
+            )
+            assert sorted([row["period"] for row in rows]) == sorted(ROLLUP_PERIODS)
+
+
+def test_views_error():
+    res = run(
+        {
+            "headers": HEADERS,
+            "views": [
+                {
+                    "view_id": VIEW_ID,
+                    "website": WEBSITE,
+                    "principal_content_type": PRINCIPAL_CONTENT_TYPE,
+                },
+                {
+                    "view_id": "0",
+                    "website": "0.com",
+                    "principal_content_type": PRINCIPAL_CONTENT_TYPE,
+                },
+            ],
+            **DATE,
+            "consolidated": True,
+        }
+    )
+    assert "error" not in res["views"][0]
+    assert res["views"][1]["error"]
+    assert [i for i in res["loads"] if i["output_rows"] > 0]
 
 
 @pytest.mark.parametrize(
@@ -61,8 +122,12 @@ def test_units(data):
             "tasks": "ga",
             **DATE,
         },
+        {
+            "tasks": "ga",
+            "consolidated": True,
+        },
     ],
-    ids=["auto", "manual"],
+    ids=["auto", "manual", "consolidated"],
 )
 def test_tasks(data):
     res = run(data)